@@ -7,39 +7,147 @@ Keep track of your work hours. Add, delete, update records.
 Export and print at the end of the month!
 """
 
-import os
 import re
 import sys
-import argparse
-import datetime
-from timesheet import Timesheet
+from argparse import ArgumentParser, SUPPRESS
+
+__version__ = "0.9"
+__prog__ = "azubi-timesheet"
+
+# Maps each subcommand to the Timesheet method implementing it, the
+# message to print when that method reports failure, its help text and
+# whether it works on a whole record and takes the record options too.
+DISPATCH = {
+    "add": ("add_record", "Record already exists.",
+            "Add a new record.", True),
+    "delete": ("delete_record", "Record with given date not found.",
+               "Delete the record of the given date.", False),
+    "update": ("update_record", "Record with given date not found.",
+               "Update the record of the given date.", True),
+    "export": ("export", "No idea why yet.",
+               "Export the records of the given date's month to xlsx.", False),
+}
+SUBCOMMAND_METAVAR = " | ".join(DISPATCH)
+
+# Formats accepted by parse_date() and parse_time_interval(), e.g.
+# '7.10.2019' and '09:00-17:30'; range checks are left to datetime.
+DATE_REGEX = re.compile(r"([0-9]{1,2})[.,-]([0-9]{1,2})[.,-]([0-9]{4})")
+TIME_INTERVAL_REGEX = re.compile(r"([0-9]{1,2}):([0-9]{2})-([0-9]{1,2}):([0-9]{2})")
+
+RECORD_SUBCOMMANDS = tuple(name for name, entry in DISPATCH.items() if entry[3])
+
+# Options understood by fast_parse(), mapped to the attribute they set.
+FLAG_OPTIONS = {
+    "-n": "non_interactive", "--non-interactive": "non_interactive",
+}
+VALUE_OPTIONS = {
+    "-d": "date", "--date": "date",
+}
+RECORD_FLAG_OPTIONS = {
+    **FLAG_OPTIONS,
+    "-s": "special", "--special-record": "special",
+}
+RECORD_VALUE_OPTIONS = {
+    **VALUE_OPTIONS,
+    "-w": "work_hours", "--work-hours": "work_hours",
+    "-b": "break_time", "--break-time": "break_time",
+    "-c": "comment", "--comment": "comment",
+}
+
+# What `--help` prints, written out so a bare invocation doesn't have to
+# build the parser. Keep in sync with parse_cli().
+HELP = (
+    f"usage: {__prog__} [-v] [-n] [-s] [-d DD.MM.YYYY] [-w HH:MM-HH:MM]\n"
+    "                       [-b HH:MM-HH:MM] [-c COMMENT] [-h]\n"
+    f"                       {SUBCOMMAND_METAVAR} ...\n"
+    "\n"
+    "Keep track of your work hours. Add, delete, update records. Export and print\n"
+    "at the end of the month!\n"
+    "\n"
+    "positional arguments:\n"
+    f"  {SUBCOMMAND_METAVAR}\n"
+    "                        Choose one of these subcommands.\n"
+    + "".join(f"    {name:<20}{entry[2]}\n" for name, entry in DISPATCH.items()) +
+    "\n"
+    "options:\n"
+    "  -v, --version         Show program's version number and exit.\n"
+    "  -n, --non-interactive\n"
+    "                        Do not ask anything, use default answers\n"
+    "                        automatically. Implied when stdin is not a terminal.\n"
+    "  -s, --special-record  Special records only need a date and a comment.\n"
+    "  -d DD.MM.YYYY, --date DD.MM.YYYY\n"
+    "                        Date of the record.\n"
+    "  -w HH:MM-HH:MM, --work-hours HH:MM-HH:MM\n"
+    "                        Begin and end time of the work day.\n"
+    "  -b HH:MM-HH:MM, --break-time HH:MM-HH:MM\n"
+    "                        Begin and end time of the break.\n"
+    "  -c COMMENT, --comment COMMENT\n"
+    "                        Comment of the record, if needed.\n"
+    "  -h, --help            Show this help message and exit.\n"
+)
+
+class Args(object):
+    """Parsed command line, filled by :func:`fast_parse` or :func:`parse_cli`.
+    """
+    __slots__ = ("subcommand", "non_interactive", "special", "date",
+                 "work_hours", "break_time", "comment", "parser")
+
+    def __init__(self, **kwargs):
+        """Constructor, sets the given attributes.
+        """
+        for name, value in kwargs.items():
+            setattr(self, name, value)
 
 def execute(args):
-    """Checks which subcommand was given and executes it.
+    """Looks up the given subcommand in :data:`DISPATCH` and executes it.
 
     :param args: The namespace containing the scripts arguments
-    :type args: :class:`argparse.Namespace`
+    :type args: :class:`Args`
+    """
+    # Imported here, so --help and --version don't pay for openpyxl & co.
+    from timesheet import Timesheet, load_config
+    method_name, message = DISPATCH[args.subcommand][:2]
+    timesheet = Timesheet(args, load_config("config.json"))
+    if not getattr(timesheet, method_name)():
+        sys.exit(f"Exiting. {message}")
+
+def parse_date(date):
+    """Parse a date of format 'DD.MM.YYYY'.
+
+    :param str date: The date to parse
+    :return: date object: date(year, month, day)
+    :rtype: datetime.date
+    :raises ValueError: if date has the wrong format or is out of range
     """
-    timesheet = Timesheet(args, config_file="config.json")
-    if args.subcommand == "add":
-        if not timesheet.add_record():
-            print("Exiting. Record already exists.")
-            sys.exit(1)
-    elif args.subcommand == "update":
-        if not timesheet.update_record():
-            print("Exiting. Record with given date not found.")
-            sys.exit(1)
-    elif args.subcommand == "delete":
-        if not timesheet.delete_record():
-            print("Exiting. Record with given date not found.")
-            sys.exit(1)
-    elif args.subcommand == "export":
-        if not timesheet.export():
-            print("Exiting. No idea why yet.")
-            sys.exit(1)
+    import datetime
+    match = DATE_REGEX.fullmatch(date)
+    if not match:
+        raise ValueError(f"expected format 'DD.MM.YYYY', got {date!r}")
+    day, month, year = map(int, match.groups())
+    # cheap bounds check first, datetime still catches e.g. 30.02.
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        raise ValueError(f"day or month of {date!r} is out of range")
+    if not 1900 <= year <= 2100:
+        raise ValueError(f"year of {date!r} must be in 1900..2100")
+    return datetime.date(year, month, day)
+
+def parse_time_interval(time_interval):
+    """Parse a time interval of format 'HH:MM-HH:MM'.
+
+    :param str time_interval: The time interval to parse
+    :return: Two time objects: time(hour, minute)
+    :rtype: tuple(datetime.time, datetime.time)
+    :raises ValueError: if time_interval has the wrong format or is out of range
+    """
+    import datetime
+    match = TIME_INTERVAL_REGEX.fullmatch(time_interval)
+    if not match:
+        raise ValueError(f"expected format 'HH:MM-HH:MM', got {time_interval!r}")
+    start_hour, start_minute, end_hour, end_minute = map(int, match.groups())
+    return datetime.time(start_hour, start_minute), datetime.time(end_hour, end_minute)
 
 def check_date(date, non_interactive, message, attempts=3):
-    """Check that date respects format 'DD.MM.YYYY'.
+    """Check that date respects format 'DD.MM.YYYY', ask again if it doesn't.
 
     :param str date: The date supplied from the command line
     :param bool non_interactive: Tells the function if asking for user input is ok
@@ -48,152 +156,193 @@ def check_date(date, non_interactive, message, attempts=3):
     :return: Validated date object: date(year, month, day)
     :rtype: datetime.date
     """
-    # Example of match dict: {'day': '3', 'month': '10', 'year': '2019'}
-    regex = r'(?P<day>[0-9]{1,2})([\.,-])(?P<month>[0-9]{1,2})([\.,-])(?P<year>[0-9]{4})'
     if non_interactive:
         attempts = 1
-    while attempts:
-        if not date and not non_interactive:
+    for _ in range(attempts):
+        if not date:
+            if non_interactive:
+                break
             date = input(message)
-        match = re.match(regex, date)
-        if match:
-            year = int(match.group("year"))
-            month = int(match.group("month"))
-            day = int(match.group("day"))
-            date = datetime.date(year, month, day)
-            return date
-        else:
-            attempts -= 1
+        try:
+            return parse_date(date)
+        except ValueError as error:
             date = ""
-            print("Expected date of following format: 'DD.MM.YYYY'")
-    print("Exiting. You entered invalid date or didn't enter any input.")
-    sys.exit(1)
+            sys.stderr.write(f"Invalid date: {error}\n")
+    sys.exit("Exiting. You entered invalid date or didn't enter any input.")
 
 def check_time_interval(time_interval, non_interactive, name="", attempts=3):
-    """Check that time interval respects format 'HH:MM-HH:MM'.
+    """Check that time interval respects format 'HH:MM-HH:MM', ask again if it doesn't.
 
     :param str time_interval: The time interval supplied from the command line
     :param bool non_interactive: Tells the function if asking for user input is ok
-    :param str name: Name of time interval, used when printing to stdout
+    :param str name: Name of time interval, used in prompts and error messages
     :param int attempts: Allowed number of attempts to specify a valid time interval
     :return: Two validated time objects: time(hour, minute)
     :rtype: tuple(datetime.time, datetime.time)
     """
-    # Example of match dict: {'start_hour': '09', 'start_minute': '00',
-    #                         'end_hour': '17', 'end_minute': '30'}
-    regex = r"(?P<start_hour>[0-9]|0[0-9]|1[0-9]|2[0-3])(:)"\
-             "(?P<start_minute>[0-5][0-9])([\-])"\
-             "(?P<end_hour>[0-9]|0[0-9]|1[0-9]|2[0-3])(:)"\
-             "(?P<end_minute>[0-5][0-9])"
     if non_interactive:
         attempts = 1
-    while attempts:
-        if not time_interval and not non_interactive:
-            time_interval = input("- Enter the BEGIN and END {}: ".format(name))
-        match = re.match(regex, time_interval)
-        if match:
-            start_hour = int(match.group("start_hour"))
-            start_minute = int(match.group("start_minute"))
-            end_hour = int(match.group("end_hour"))
-            end_minute = int(match.group("end_minute"))
-            start_time = datetime.time(start_hour, start_minute)
-            end_time = datetime.time(end_hour, end_minute)
-            return start_time, end_time
-        else:
-            attempts -= 1
+    prompt = f"- Enter the BEGIN and END {name}: "
+    for _ in range(attempts):
+        if not time_interval:
+            if non_interactive:
+                break
+            time_interval = input(prompt)
+        try:
+            return parse_time_interval(time_interval)
+        except ValueError as error:
             time_interval = ""
-            print("Expected {} of following format: 'HH:MM-HH:MM'".format(name))
-    print("Exiting. You entered invalid {} or didn't enter any input.".format(name))
-    sys.exit(1)
+            sys.stderr.write(f"Invalid {name}: {error}\n")
+    sys.exit(f"Exiting. You entered invalid {name} or didn't enter any input.")
 
 def check_args(args):
     """Checks if no arguments were given when running the script and asks for them.
 
     :param args: The namespace containing the scripts arguments
-    :type args: :class:`argparse.Namespace`
+    :type args: :class:`Args`
     """
     # checking date
     args.date = check_date(args.date, args.non_interactive, "- Enter the DATE of record: ")
-    if not args.subcommand in ["delete", "export"]:
-        # checking comment
-        if not args.comment and not args.non_interactive:
-            args.comment=input("- Enter the COMMENT of record, if needed: ")
-        if not args.special:
-            # checking work hours
-            args.work_hours = check_time_interval(args.work_hours, args.non_interactive, "WORK HOURS")
-            # checking break
-            args.break_time = check_time_interval(args.break_time, args.non_interactive, "BREAK TIME")
+    if args.subcommand not in RECORD_SUBCOMMANDS:
+        return
+    # checking comment
+    if not args.comment and not args.non_interactive:
+        args.comment=input("- Enter the COMMENT of record, if needed: ")
+    if not args.special:
+        # checking work hours
+        args.work_hours = check_time_interval(args.work_hours, args.non_interactive, "WORK HOURS")
+        # checking break
+        args.break_time = check_time_interval(args.break_time, args.non_interactive, "BREAK TIME")
+    else:
+        import datetime
+        # time objects are immutable, so both intervals can share one tuple
+        midnight = datetime.time(0, 0)
+        args.work_hours = args.break_time = (midnight, midnight)
+
+def fast_parse(argv):
+    """Parse the usual command lines without building an argument parser.
+
+    Only a subcommand and plain options from the ``*_OPTIONS`` dicts are
+    understood, the record options after the subcommand only for
+    :data:`RECORD_SUBCOMMANDS`. Everything else (help, version,
+    ``--opt=value``, abbreviations, errors, ...) is left to argparse.
+
+    :param list argv: Arguments to parse
+    :return: parsed CLI result or None if argparse has to do the job
+    :rtype: :class:`Args` or None
+    """
+    args = Args(subcommand=None, non_interactive=False, special=False,
+                date="", work_hours="", break_time="", comment="",
+                parser=None)
+    # like argparse, accept every option in front of the subcommand
+    flag_options, value_options = RECORD_FLAG_OPTIONS, RECORD_VALUE_OPTIONS
+    tokens = iter(argv)
+    for token in tokens:
+        if token in flag_options:
+            setattr(args, flag_options[token], True)
+        elif token in value_options:
+            value = next(tokens, None)
+            if value is None or value.startswith("-"):
+                return None
+            setattr(args, value_options[token], value)
+        elif args.subcommand is None and token in DISPATCH:
+            args.subcommand = token
+            if token not in RECORD_SUBCOMMANDS:
+                flag_options, value_options = FLAG_OPTIONS, VALUE_OPTIONS
         else:
-            args.work_hours = (datetime.time(0, 0), datetime.time(0, 0))
-            args.break_time = (datetime.time(0, 0), datetime.time(0, 0))
+            return None
+    if args.subcommand is None:
+        return None
+    return args
 
-def parse_cli(args=None):
-    """Parse CLI with :class:`argparse.ArgumentParser` and return parsed result.
+def add_options(parser, takes_record):
+    """Add the options of a subcommand to parser.
 
-    :param list args: Arguments to parse or None (=use sys.argv)
-    :return: parsed CLI result
-    :rtype: :class:`argparse.Namespace`
+    :param parser: The parser to add the options to
+    :type parser: :class:`argparse.ArgumentParser`
+    :param bool takes_record: Whether to add the options describing a record
     """
-    parser=argparse.ArgumentParser(description=__doc__,
-                                     prog="azubi-timesheet",
-                                     add_help=False)
-    parser.add_argument("-v", "--version",
-                        action="version",
-                        version="%(prog)s v0.9",
-                        help="Show program's version number and exit."
-                        )
-    parser.add_argument(action="store",
-                        dest="subcommand",
-                        metavar="add | delete | update | export",
-                        choices=["add", "delete", "update", "export"],
-                        nargs="?",
-                        help="Choose one of these subcommands.",
-                        )
     parser.add_argument("-n", "--non-interactive",
                         action="store_true",
                         dest="non_interactive",
-                        help="Do not ask anything, use default answers automatically.",
-                        )
-    parser.add_argument("-s", "--special-record",
-                        action="store_true",
-                        dest="special",
-                        help="Special records only need a date and a comment.",
+                        help="Do not ask anything, use default answers automatically. "
+                             "Implied when stdin is not a terminal.",
                         )
+    if takes_record:
+        parser.add_argument("-s", "--special-record",
+                            action="store_true",
+                            dest="special",
+                            help="Special records only need a date and a comment.",
+                            )
     parser.add_argument("-d", "--date",
                         dest="date",
                         metavar="DD.MM.YYYY",
-                        default="",
                         help="Date of the record.",
                         )
-    parser.add_argument("-w", "--work-hours",
-                        dest="work_hours",
-                        metavar="HH:MM-HH:MM",
-                        default="",
-                        help="Begin and end time of the work day.",
-                        )
-    parser.add_argument("-b", "--break-time",
-                        dest="break_time",
-                        metavar="HH:MM-HH:MM",
-                        default="",
-                        help="Begin and end time of the break.",
-                        )
-    parser.add_argument("-c", "--comment",
-                        dest="comment",
-                        default="",
-                        help="Comment of the record, if needed.",
-                        )
+    if takes_record:
+        parser.add_argument("-w", "--work-hours",
+                            dest="work_hours",
+                            metavar="HH:MM-HH:MM",
+                            help="Begin and end time of the work day.",
+                            )
+        parser.add_argument("-b", "--break-time",
+                            dest="break_time",
+                            metavar="HH:MM-HH:MM",
+                            help="Begin and end time of the break.",
+                            )
+        parser.add_argument("-c", "--comment",
+                            dest="comment",
+                            help="Comment of the record, if needed.",
+                            )
     parser.add_argument("-h", "--help",
                         action="help",
-                        default=argparse.SUPPRESS,
+                        default=SUPPRESS,
                         help="Show this help message and exit.",
                         )
-    args = parser.parse_args(args)
-    args.parser = parser
+
+def parse_cli(args=None):
+    """Parse CLI with :class:`argparse.ArgumentParser` and return parsed result.
+
+    :param list args: Arguments to parse or None (=use sys.argv)
+    :return: parsed CLI result
+    :rtype: :class:`Args`
+    """
+    if args is None:
+        args = sys.argv[1:]
     # If no argument is given, print help info:
-    if not sys.argv[1:]:
-        parser.print_help()
+    if not args:
+        sys.stdout.write(HELP)
         sys.exit(0)
-    return args
+    namespace = fast_parse(args)
+    if namespace is not None:
+        return namespace
+    parser=ArgumentParser(description=__doc__,
+                          prog=__prog__,
+                          add_help=False)
+    parser.add_argument("-v", "--version",
+                        action="version",
+                        version=f"%(prog)s v{__version__}",
+                        help="Show program's version number and exit."
+                        )
+    subparsers = parser.add_subparsers(dest="subcommand",
+                                       metavar=SUBCOMMAND_METAVAR,
+                                       help="Choose one of these subcommands.",
+                                       )
+    subparsers.required = True
+    # Options are accepted before and after the subcommand. The copies in
+    # the subparsers have no defaults, so they don't overwrite values given
+    # before the subcommand.
+    parser.set_defaults(date="", work_hours="", break_time="", comment="")
+    add_options(parser, takes_record=True)
+    for name, (_, _, help_text, takes_record) in DISPATCH.items():
+        subparser = subparsers.add_parser(name,
+                                          argument_default=SUPPRESS,
+                                          add_help=False,
+                                          help=help_text,
+                                          )
+        add_options(subparser, takes_record)
+    # argparse needs a namespace with a __dict__, so copy the result over
+    return Args(parser=parser, **vars(parser.parse_args(args)))
 
 def main(args=None):
     """Main function of the script.
@@ -201,6 +350,9 @@ def main(args=None):
     :param list args: a list of arguments (sys.argv[:1])
     """
     args = parse_cli(args)
+    # Nobody can answer prompts when reading from a pipe or file
+    if sys.stdin is None or not sys.stdin.isatty():
+        args.non_interactive = True
     check_args(args)
     execute(args)
     return 0
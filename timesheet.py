@@ -1,31 +1,60 @@
 import os
 import sys
+import stat
 import json
 import locale
 from datetime import datetime
 from datetime import timedelta
+from functools import lru_cache
 from openpyxl import load_workbook
 
+@lru_cache(maxsize=1)
+def read_config(config_file, mtime_ns):
+    """Read and parse the configuration file.
+    Results are cached, the modification time makes sure a changed file is read again.
+    The cached dict is shared between callers, use :func:`load_config` instead.
+
+    :param str config_file: Name of configuration file
+    :param int mtime_ns: Modification time of the file in nanoseconds
+    :return: content from file
+    :rtype: dict
+    """
+    with open(config_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_config(config_file):
+    """Load configuration file, exit if it's missing or empty.
+
+    :param str config_file: Name of configuration file
+    :return: copy of the content from file, free to modify
+    :rtype: dict
+    """
+    try:
+        file_stat = os.stat(config_file)
+    except OSError:
+        file_stat = None
+    if file_stat is None or not stat.S_ISREG(file_stat.st_mode) or not file_stat.st_size:
+        sys.exit("Exiting. Configuration file '{}' not found.".format(config_file))
+    return dict(read_config(config_file, file_stat.st_mtime_ns))
+
 class Timesheet(object):
     """Object for managing a timesheet.
     Saves records in a JSON file.
     """
-    def __init__(self, args, config_file):
+    def __init__(self, args, config):
         """Constructor,  initializes the instance attributes.
 
         :param args: argparse.Namespace object
-        :param str config_file: Name of configuration file
+        :param dict config: Configuration, see :func:`load_config`
         """
         super(Timesheet, self).__init__()
-        self.configure_attr(args, config_file)
+        self.configure_attr(args, config)
 
-    def configure_attr(self, args, config_file):
+    def configure_attr(self, args, config):
         """Initializes instance attributes.
         """
         self.args = args
-        self.config = self.load_json_file(config_file)
-        if self.config == None:
-            sys.exit("Exiting. Configuration file '{}' not found.".format(config_file))
+        self.config = config
 
         self.date_str = self.args.date.strftime("%d.%m.%Y")
         self.month_str = self.args.date.strftime("%m")